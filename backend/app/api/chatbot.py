@@ -8,14 +8,17 @@ from fastapi import (
     Header,
     Request,
 )
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import AsyncIterator, Awaitable, Callable, Optional, Tuple
 from datetime import datetime, UTC
+from collections import defaultdict
 from app.services.grok_service import grok_service
 from app.services.kaggle_notebook_service import kaggle_notebook_service
 from app.services.plantnet_service import plantnet_service
 from app.services.plant_id_service import plant_id_service
 from app.services.usda_service import usda_service
+from app.services.cache_service import cache_service
 from app.core.security import ImageSecurity, AuthSecurity
 from app.core.rate_limiter import rate_limiter
 from app.core.config import settings
@@ -25,13 +28,151 @@ from app.core.exceptions import (
 )
 import uuid
 from PIL import Image
+import numpy as np
+import asyncio
+import hashlib
 import io
 import logging
+import orjson
+import time
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
+# [epoch second, ISO string] - response timestamps have second granularity
+_TS_CACHE = [0, ""]
+
+
+def _iso_now() -> str:
+    """Current UTC time as ISO string, formatted at most once per second"""
+    now = int(time.time())
+    if now != _TS_CACHE[0]:
+        _TS_CACHE[0] = now
+        _TS_CACHE[1] = datetime.fromtimestamp(now, UTC).isoformat()
+    return _TS_CACHE[1]
+
+
+def _message_digest(message: str) -> str:
+    """Short digest of the normalized user question"""
+    return hashlib.sha1(message.strip().lower().encode()).hexdigest()[:16]
+
+
+def _response_cache_key(image_hash: str, message_digest: str) -> str:
+    """Cache key for identical image + question pairs"""
+    return f"plant:v1:{image_hash[:32]}:{message_digest}"
+
+
+def _empty_plant_row() -> dict:
+    """Blank ensemble row - filled in by _ingest"""
+    return {
+        "kaggle_score": 0,
+        "plantnet_score": 0,
+        "usda_verified": False,
+        "_sources": set(),
+    }
+
+
+def _ingest(plant_scores: dict, source_results: list, score_key: str, source_name: str):
+    """
+    Merge one API's top-5 results into plant_scores in a single pass.
+    Names are keyed case-insensitively so "Rosa Gallica" and "Rosa gallica"
+    from different APIs combine into one row.
+    """
+    for result in (source_results or [])[:5]:
+        if not isinstance(result, dict):
+            continue
+        name = (
+            result.get("scientificName") or result.get("scientific_name") or ""
+        ).strip()
+        if not name:
+            continue
+
+        row = plant_scores[name.casefold()]
+        row.setdefault("scientificName", name)
+        row.setdefault(
+            "commonName", result.get("commonName", result.get("common_name", ""))
+        )
+        row.setdefault("family", result.get("family", ""))
+        score = result.get("certainty", result.get("score", 0))
+        row[score_key] = max(row[score_key], score)
+        row["_sources"].add(source_name)
+
+
+def _load_image(image_bytes: bytes) -> Image.Image:
+    """Decode, convert to RGB and shrink to the API input size (CPU-bound)"""
+    pil_image = Image.open(io.BytesIO(image_bytes))
+    if pil_image.mode != "RGB":
+        pil_image = pil_image.convert("RGB")
+    # Neither API needs more than ~1024px - shrink once, shared by both
+    pil_image.thumbnail((1024, 1024), Image.Resampling.LANCZOS)
+    return pil_image
+
+
+def _encode_jpeg(pil_image: Image.Image) -> bytes:
+    """Compact JPEG encoding shared by outbound API calls (CPU-bound)"""
+    buffer = io.BytesIO()
+    pil_image.save(buffer, format="JPEG", quality=85, optimize=True)
+    return buffer.getvalue()
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format a Server-Sent Events frame with a JSON payload"""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+async def _single_token(
+    text: str, from_llm: bool = False
+) -> AsyncIterator[Tuple[str, bool]]:
+    """Wrap an already complete response as a (token, from_llm) stream"""
+    yield text, from_llm
+
+
+async def _stream_answer(
+    header: dict,
+    tokens: AsyncIterator[Tuple[str, bool]],
+    on_complete: Optional[Callable[[str, bool], Awaitable[None]]] = None,
+) -> AsyncIterator[str]:
+    """
+    SSE stream: "meta" frame (everything but the answer), "token" frames as the
+    LLM generates, then a "done" trailer with the timestamp.
+    A stream that fails part-way ends with an "error" frame instead and the
+    partial answer is not passed to on_complete.
+    """
+    yield _sse_event("meta", header)
+
+    parts = []
+    from_llm = True
+    try:
+        async for token, token_from_llm in tokens:
+            parts.append(token)
+            from_llm = from_llm and token_from_llm
+            yield _sse_event("token", {"text": token})
+    except Exception as e:
+        logger.warning(f"⚠️ Answer stream aborted after {len(parts)} tokens: {e}")
+        yield _sse_event("error", {"message": str(e), "timestamp": _iso_now()})
+        return
+
+    yield _sse_event("done", {"timestamp": _iso_now()})
+
+    if on_complete:
+        await on_complete("".join(parts), from_llm)
+
+
+def _cached_answer(cached: dict, stream: bool, **overrides):
+    """Serve a cached chat-with-image response (JSON or SSE replay)"""
+    if not stream:
+        return {**cached, **overrides, "timestamp": _iso_now()}
+
+    header = {k: v for k, v in cached.items() if k not in ("response", "timestamp")}
+    return StreamingResponse(
+        _stream_answer(
+            {**header, **overrides}, _single_token(cached["response"], True)
+        ),
+        media_type="text/event-stream",
+    )
+
+
 class ChatMessage(BaseModel):
     role: str
     content: str
@@ -41,6 +182,7 @@ class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
     conversation_history: Optional[list] = None  # Accept chat history from frontend
+    stream: bool = False  # Server-Sent Events instead of a single JSON body
 
 
 @router.post("/chat")
@@ -48,16 +190,25 @@ async def chat(request: ChatRequest):
     """Text-only chat endpoint - uses LLM directly"""
     session_id = request.session_id or str(uuid.uuid4())
 
+    if request.stream:
+        return StreamingResponse(
+            _stream_answer(
+                {"session_id": session_id},
+                grok_service.stream_response(request.message),
+            ),
+            media_type="text/event-stream",
+        )
+
     try:
         # Generate response using LLM
-        response = await grok_service.generate_response(request.message)
+        response, _ = await grok_service.generate_response(request.message)
 
         # Note: Database logging disabled (no PostgreSQL)
 
         return {
             "session_id": session_id,
             "response": response,
-            "timestamp": datetime.now(UTC).isoformat(),
+            "timestamp": _iso_now(),
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -69,6 +220,7 @@ async def chat_with_image(
     file: UploadFile = File(...),
     message: str = Form(...),
     session_id: Optional[str] = Form(None),
+    stream: bool = Form(False),
     x_api_key: Optional[str] = Header(None),
     _rate_limit: None = Depends(rate_limiter),
 ):
@@ -81,6 +233,10 @@ async def chat_with_image(
     3. USDA Service → Validation + additional info (93K local plants)
     4. LLM (Gemini/OpenRouter) → Turkish explanation generation
 
+    With stream=true the answer is sent as Server-Sent Events:
+    "meta" (identified plants), "token" (LLM output), "done" (timestamp),
+    or "error" if the LLM stream breaks off.
+
     Security Layers:
     1. API Key Authentication (optional)
     2. Rate Limiting (Redis-powered)
@@ -111,49 +267,91 @@ async def chat_with_image(
         session_id = session_id or str(uuid.uuid4())
 
         # Image hash for duplicate detection
-        image_hash = ImageSecurity.compute_image_hash(sanitized_bytes)
+        # CPU-bound work runs in the thread pool to keep the event loop free
+        image_hash = await asyncio.to_thread(
+            ImageSecurity.compute_image_hash, sanitized_bytes
+        )
         logger.info(f"📸 Image hash: {image_hash[:16]}...")
 
+        # Identical image + question → reuse the previous answer
+        message_digest = _message_digest(safe_message)
+        cache_key = _response_cache_key(image_hash, message_digest)
+        cached = await cache_service.get_json(cache_key)
+        if cached:
+            logger.info(f"⚡ Cache hit: {cache_key}")
+            return _cached_answer(
+                cached,
+                stream,
+                session_id=session_id,
+                image_hash=image_hash[:16],
+                cache_source="exact",
+            )
+
         # Load image
-        pil_image = Image.open(io.BytesIO(sanitized_bytes))
-        if pil_image.mode != "RGB":
-            pil_image = pil_image.convert("RGB")
+        pil_image = await asyncio.to_thread(_load_image, sanitized_bytes)
         logger.info(f"🖼️ Image loaded: {pil_image.size}")
 
+        # Visually similar image (re-compressed, resized) + same question
+        phash = await asyncio.to_thread(
+            ImageSecurity.compute_perceptual_hash, pil_image
+        )
+        similar_key = cache_service.find_similar(
+            phash, scope=message_digest, max_distance=settings.PHASH_MAX_DISTANCE
+        )
+        if similar_key:
+            cached = await cache_service.get_json(similar_key)
+            if cached:
+                logger.info(f"⚡ Near-duplicate cache hit: {similar_key}")
+                return _cached_answer(
+                    cached,
+                    stream,
+                    session_id=session_id,
+                    image_hash=image_hash[:16],
+                    cache_source="phash",
+                )
+
+        # Cache miss - encode the upstream JPEG only now
+        compact_bytes = await asyncio.to_thread(_encode_jpeg, pil_image)
+        logger.info(
+            f"🗜️ {len(sanitized_bytes)} -> {len(compact_bytes)} bytes for upstream APIs"
+        )
+
         # ═══════════════════════════════════════════════════════════════
         # STEP 1 & 2: CONCURRENT API CALLS - Kaggle + PlantNet in parallel
         # ═══════════════════════════════════════════════════════════════
-        import asyncio
-
         logger.info("🔍 Querying Kaggle PlantCLEF and PlantNet APIs concurrently...")
 
-        # Run both API calls in parallel for faster response
-        kaggle_task = kaggle_notebook_service.identify_plant(sanitized_bytes, top_k=5)
-        plantnet_task = plantnet_service.identify_plant(sanitized_bytes)
+        # Schedule both API calls on the event loop so they overlap
+        # Both services receive the same compact JPEG - encoded once, and
+        # PlantNet passes it through without re-encoding
+        kaggle_task = asyncio.create_task(
+            kaggle_notebook_service.identify_plant(compact_bytes, top_k=5)
+        )
+        plantnet_task = asyncio.create_task(plantnet_service.identify_plant(compact_bytes))
 
-        # Wait for both to complete (or fail)
-        results = await asyncio.gather(
+        # Wait for both to complete (or fail) - latency is max(), not sum()
+        kaggle_results, plantnet_results = await asyncio.gather(
             kaggle_task, plantnet_task, return_exceptions=True
         )
 
         # Process Kaggle results
-        kaggle_results = []
-        if isinstance(results[0], Exception):
-            logger.warning(f"⚠️ Kaggle API failed: {results[0]}")
-        elif results[0]:
-            kaggle_results = results[0]
+        if isinstance(kaggle_results, Exception):
+            logger.warning(f"⚠️ Kaggle API failed: {kaggle_results}")
+            kaggle_results = []
+        elif kaggle_results:
             logger.info(f"✅ Kaggle found {len(kaggle_results)} predictions")
         else:
+            kaggle_results = []
             logger.warning("⚠️ Kaggle returned no results")
 
         # Process PlantNet results
-        plantnet_results = []
-        if isinstance(results[1], Exception):
-            logger.warning(f"⚠️ PlantNet API failed: {results[1]}")
-        elif results[1]:
-            plantnet_results = results[1]
+        if isinstance(plantnet_results, Exception):
+            logger.warning(f"⚠️ PlantNet API failed: {plantnet_results}")
+            plantnet_results = []
+        elif plantnet_results:
             logger.info(f"✅ PlantNet found {len(plantnet_results)} results")
         else:
+            plantnet_results = []
             logger.warning("⚠️ PlantNet returned no results")
 
         # ═══════════════════════════════════════════════════════════════
@@ -186,77 +384,34 @@ async def chat_with_image(
         )
 
         # Collect all unique plants with weighted scores
-        plant_scores = {}  # {scientific_name: {data, kaggle_score, plantnet_score, weighted_score}}
+        # {casefolded scientific_name: {data, kaggle_score, plantnet_score, weighted_score}}
+        plant_scores = defaultdict(_empty_plant_row)
+        _ingest(plant_scores, kaggle_results, "kaggle_score", "kaggle-plantclef")
+        _ingest(plant_scores, plantnet_results, "plantnet_score", "plantnet")
+
+        # Calculate weighted scores - score columns (SoA) combined in one vector op
+        rows = list(plant_scores.values())
+        scores = np.array(
+            [(data["kaggle_score"], data["plantnet_score"]) for data in rows],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+        weighted_scores = scores @ np.array(
+            [settings.KAGGLE_WEIGHT, settings.PLANTNET_WEIGHT], dtype=np.float64
+        )
 
-        # Process Kaggle results
-        for result in (kaggle_results or [])[:5]:
-            if not isinstance(result, dict):
-                continue
-            name = result.get(
-                "scientificName", result.get("scientific_name", "")
-            ).strip()
-            if not name:
-                continue
-
-            score = result.get("certainty", result.get("score", 0))
-            if name not in plant_scores:
-                plant_scores[name] = {
-                    "scientificName": name,
-                    "commonName": result.get(
-                        "commonName", result.get("common_name", "")
-                    ),
-                    "family": result.get("family", ""),
-                    "kaggle_score": score,
-                    "plantnet_score": 0,
-                    "source": "kaggle-plantclef",
-                    "usda_verified": False,
-                }
-            else:
-                plant_scores[name]["kaggle_score"] = max(
-                    plant_scores[name]["kaggle_score"], score
-                )
+        # USDA validation - one batch lookup for all candidates
+        usda_hits = usda_service.find_many([data["scientificName"] for data in rows])
 
-        # Process PlantNet results
-        for result in (plantnet_results or [])[:5]:
-            if not isinstance(result, dict):
-                continue
-            name = result.get(
-                "scientificName", result.get("scientific_name", "")
-            ).strip()
-            if not name:
-                continue
-
-            score = result.get("certainty", result.get("score", 0))
-            if name not in plant_scores:
-                plant_scores[name] = {
-                    "scientificName": name,
-                    "commonName": result.get(
-                        "commonName", result.get("common_name", "")
-                    ),
-                    "family": result.get("family", ""),
-                    "kaggle_score": 0,
-                    "plantnet_score": score,
-                    "source": "plantnet",
-                    "usda_verified": False,
-                }
-            else:
-                plant_scores[name]["plantnet_score"] = max(
-                    plant_scores[name]["plantnet_score"], score
-                )
-                # Update source if both found
-                if plant_scores[name]["kaggle_score"] > 0:
-                    plant_scores[name]["source"] = "kaggle+plantnet"
-
-        # Calculate weighted scores
-        for name, data in plant_scores.items():
-            weighted = (data["kaggle_score"] * settings.KAGGLE_WEIGHT) + (
-                data["plantnet_score"] * settings.PLANTNET_WEIGHT
+        for data, weighted in zip(rows, weighted_scores.tolist()):
+            name = data["scientificName"]
+            sources = data.pop("_sources")
+            data["source"] = (
+                "kaggle+plantnet" if len(sources) > 1 else next(iter(sources))
             )
             data["weighted_score"] = weighted
             data["confidence"] = weighted
 
-            # USDA validation
-            usda_data = usda_service.find_by_scientific_name(name)
+            usda_data = usda_hits.get(name)
             if usda_data:
                 data["usda_verified"] = True
                 data["usda_symbol"] = usda_data.get("symbol", "")
@@ -266,10 +421,9 @@ async def chat_with_image(
                     data["commonName"] = usda_data.get("common_name", "")
                 logger.info(f"✅ USDA verified: {name}")
 
-        # Sort by weighted score
-        combined_results = sorted(
-            plant_scores.values(), key=lambda x: x["weighted_score"], reverse=True
-        )
+        # Sort by weighted score (stable: ties keep Kaggle-first insertion order)
+        order = np.argsort(-weighted_scores, kind="stable")
+        combined_results = [rows[i] for i in order]
         logger.info(
             f"📊 Combined {len(combined_results)} unique plants with weighted scores"
         )
@@ -277,10 +431,54 @@ async def chat_with_image(
         # ═══════════════════════════════════════════════════════════════
         # STEP 5: PLANT.ID ENRICHMENT - Get detailed plant info
         # ═══════════════════════════════════════════════════════════════
+        # Enrichment runs in the background while the prompt scaffolding is built
+        combined_results = combined_results[:5]
+        enrich_task = None
         if combined_results:
             logger.info("📖 Enriching top plants with Plant.id details...")
-            combined_results = await plant_id_service.enrich_plant_data(
-                combined_results[:5]
+            enrich_task = asyncio.create_task(
+                plant_id_service.enrich_plant_data(combined_results)
+            )
+
+        # Source summary in a single pass
+        kaggle_count = plantnet_count = usda_count = 0
+        for plant in combined_results:
+            if plant.get("source") == "kaggle-plantclef":
+                kaggle_count += 1
+            else:
+                plantnet_count += 1
+            if plant.get("usda_verified"):
+                usda_count += 1
+
+        # Prompt scaffolding that does not depend on Plant.id details
+        context_parts = [
+            f"📊 AĞIRLIKLAR: Kaggle={settings.KAGGLE_WEIGHT:.0%}, PlantNet={settings.PLANTNET_WEIGHT:.0%}\n"
+        ]
+        is_identify_query = safe_message.lower() in [
+            "identify",
+            "tanı",
+            "nedir",
+            "what is",
+            "bu ne",
+            "",
+        ]
+
+        if enrich_task:
+            combined_results = await enrich_task
+
+        # Format response
+        formatted_plants = []
+        for idx, plant in enumerate(combined_results[:3], 1):
+            formatted_plants.append(
+                {
+                    "id": idx,
+                    "scientificName": plant.get("scientificName", "Unknown"),
+                    "commonName": plant.get("commonName", ""),
+                    "family": plant.get("family", ""),
+                    "confidence": max(0.0, min(1.0, plant.get("confidence", 0))),
+                    "source": plant.get("source", "unknown"),
+                    "usda_verified": plant.get("usda_verified", False),
+                }
             )
 
         # ═══════════════════════════════════════════════════════════════
@@ -290,11 +488,6 @@ async def chat_with_image(
             top_3 = combined_results[:3]
 
             # Build rich context for GPT-5
-            context_parts = []
-            context_parts.append(
-                f"📊 AĞIRLIKLAR: Kaggle={settings.KAGGLE_WEIGHT:.0%}, PlantNet={settings.PLANTNET_WEIGHT:.0%}\n"
-            )
-
             for i, p in enumerate(top_3, 1):
                 usda_status = (
                     "✓ USDA Doğrulandı" if p.get("usda_verified") else "Doğrulanmadı"
@@ -323,14 +516,7 @@ async def chat_with_image(
             context = "\n\n".join(context_parts)
 
             # Build prompt for GPT-5
-            if safe_message.lower() in [
-                "identify",
-                "tanı",
-                "nedir",
-                "what is",
-                "bu ne",
-                "",
-            ]:
+            if is_identify_query:
                 prompt = (
                     f"Yüklenen bitkinin türünü belirle ve Türkçe açıkla.\n\n"
                     f"BULUNAN BİTKİLER (Ağırlıklı Ensemble):\n{context}\n\n"
@@ -345,15 +531,57 @@ async def chat_with_image(
                     f"GÖREV: Soruyu bu bitki bilgileriyle cevaplayarak Türkçe yanıt ver. "
                     f"En yüksek ağırlıklı skora sahip bitkiyi referans al."
                 )
+        else:
+            logger.info("⚠️ No plants found")
+
+        # Everything except the LLM answer, shared by JSON / SSE / cache
+        summary = {
+            "identified_plants": formatted_plants,
+            "total_matches": len(combined_results),
+            "highest_confidence": formatted_plants[0]["confidence"]
+            if formatted_plants
+            else 0,
+            "sources": {
+                "kaggle": kaggle_count,
+                "plantnet": plantnet_count,
+                "usda_verified": usda_count,
+            },
+            "image_hash": image_hash[:16],
+        }
+
+        async def store_in_cache(response: str, from_llm: bool):
+            # Only cache real identifications answered by an LLM - an empty result
+            # or the template fallback may come from a transient API/LLM failure
+            if combined_results and from_llm:
+                await cache_service.set_json(
+                    cache_key,
+                    {"session_id": session_id, "response": response, **summary},
+                    expire=settings.CHAT_CACHE_TTL,
+                )
+                cache_service.remember_phash(cache_key, phash, scope=message_digest)
 
-            response = await grok_service.generate_rag_response(prompt, context, top_3)
-            logger.info(f"✅ LLM response: {len(response)} chars")
+        if combined_results:
+            if stream:
+                tokens = grok_service.stream_rag_response(prompt, context, top_3)
+            else:
+                response, from_llm = await grok_service.generate_rag_response(
+                    prompt, context, top_3
+                )
+                logger.info(f"✅ LLM response: {len(response)} chars")
         else:
             response = (
                 "Görsel analizi tamamlandı ancak eşleşen bitki bulunamadı. "
                 "Lütfen daha net bir fotoğraf veya farklı açıdan çekilmiş görsel deneyin."
             )
-            logger.info("⚠️ No plants found")
+            from_llm = False
+            tokens = _single_token(response)
+
+        if stream:
+            header = {"session_id": session_id, **summary}
+            return StreamingResponse(
+                _stream_answer(header, tokens, on_complete=store_in_cache),
+                media_type="text/event-stream",
+            )
 
         # ═══════════════════════════════════════════════════════════════
         # STEP 7: Log to database & return response
@@ -361,50 +589,13 @@ async def chat_with_image(
         # Note: Database logging disabled (no PostgreSQL)
         logger.info(f"💾 Query processed: session {session_id}")
 
-        # Format response
-        formatted_plants = []
-        for idx, plant in enumerate(combined_results[:3], 1):
-            formatted_plants.append(
-                {
-                    "id": idx,
-                    "scientificName": plant.get("scientificName", "Unknown"),
-                    "commonName": plant.get("commonName", ""),
-                    "family": plant.get("family", ""),
-                    "confidence": max(0.0, min(1.0, plant.get("confidence", 0))),
-                    "source": plant.get("source", "unknown"),
-                    "usda_verified": plant.get("usda_verified", False),
-                }
-            )
+        await store_in_cache(response, from_llm)
 
         return {
             "session_id": session_id,
             "response": response,
-            "identified_plants": formatted_plants,
-            "total_matches": len(combined_results),
-            "highest_confidence": formatted_plants[0]["confidence"]
-            if formatted_plants
-            else 0,
-            "sources": {
-                "kaggle": len(
-                    [
-                        p
-                        for p in combined_results
-                        if p.get("source") == "kaggle-plantclef"
-                    ]
-                ),
-                "plantnet": len(
-                    [
-                        p
-                        for p in combined_results
-                        if p.get("source") != "kaggle-plantclef"
-                    ]
-                ),
-                "usda_verified": len(
-                    [p for p in combined_results if p.get("usda_verified")]
-                ),
-            },
-            "image_hash": image_hash[:16],
-            "timestamp": datetime.now(UTC).isoformat(),
+            **summary,
+            "timestamp": _iso_now(),
         }
 
     except HTTPException:
@@ -7,8 +7,6 @@ from app.services.plantnet_service import plantnet_service
 from app.services.grok_service import grok_service
 from app.utils.image_utils import image_processor
 from app.core.config import settings
-from PIL import Image
-import io
 
 router = APIRouter()
 
@@ -27,7 +25,7 @@ async def recognize_plant(file: UploadFile = File(...), db: Session = Depends(ge
         plantnet_results = await plantnet_service.identify_plant(image_bytes)
         
         # CLIP similarity search
-        pil_image = Image.open(io.BytesIO(image_bytes))
+        pil_image = image_processor.decode_image(image_bytes)
         embedding = clip_service.encode_image(pil_image)
         similar_plants = weaviate_service.similarity_search(embedding) if embedding else []
         
@@ -44,7 +42,7 @@ async def recognize_plant(file: UploadFile = File(...), db: Session = Depends(ge
         # Generate description
         description = None
         if top_plant:
-            description = await grok_service.generate_response(
+            description, _ = await grok_service.generate_response(
                 f"Briefly describe {top_plant['scientific_name']}"
             )
         
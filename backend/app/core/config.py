@@ -79,6 +79,10 @@ class Settings(BaseSettings):
     REDIS_PASSWORD: str = os.getenv("REDIS_PASSWORD", "")
     REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
 
+    CHAT_CACHE_TTL: int = int(os.getenv("CHAT_CACHE_TTL", "3600"))  # seconds
+    PHASH_MAX_DISTANCE: int = int(os.getenv("PHASH_MAX_DISTANCE", "8"))  # bits of 64
+    PLANT_ID_CACHE_TTL: int = int(os.getenv("PLANT_ID_CACHE_TTL", "86400"))  # seconds
+
     @property
     def REDIS_ENABLED(self) -> bool:
         """Check if Redis is enabled and accessible"""
@@ -116,6 +120,26 @@ class Settings(BaseSettings):
     PLANTNET_API_TIMEOUT: int = int(os.getenv("PLANTNET_API_TIMEOUT", "10"))
     PLANT_ID_API_TIMEOUT: int = int(os.getenv("PLANT_ID_API_TIMEOUT", "8"))
     LLM_API_TIMEOUT: int = int(os.getenv("LLM_API_TIMEOUT", "15"))
+    # Seconds a provider may run before the next one is started alongside it
+    # (~p95 of a primary chat completion; a failing provider hands over at once)
+    LLM_HEDGE_DELAY: float = float(os.getenv("LLM_HEDGE_DELAY", "8.0"))
+
+    # Outbound rate limits (requests per minute, client-side token bucket)
+    PLANTNET_RPM: int = int(os.getenv("PLANTNET_RPM", "60"))
+    PLANT_ID_RPM: int = int(os.getenv("PLANT_ID_RPM", "60"))
+    # Max in-flight Plant.id calls per process (shared by all requests)
+    PLANT_ID_MAX_CONCURRENCY: int = int(os.getenv("PLANT_ID_MAX_CONCURRENCY", "3"))
+    # Responses slower than this fraction of the provider's API timeout
+    # shrink its outbound concurrency (AIMD)
+    OUTBOUND_LATENCY_TARGET_RATIO: float = float(
+        os.getenv("OUTBOUND_LATENCY_TARGET_RATIO", "0.5")
+    )
+
+    # Outbound HTTP connection pool (shared client for Kaggle/PlantNet/Plant.id)
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "50"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
 
 
 settings = Settings()
@@ -6,10 +6,25 @@ from PIL import Image
 import io
 import hashlib
 import secrets
+import numpy as np
 from typing import Tuple, Optional
 from app.core.config import settings
 from app.core.exceptions import ImageValidationError, RateLimitError
 
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II basis matrix (n x n)"""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    basis = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    basis[0] /= np.sqrt(2.0)
+    return basis
+
+
+# pHash works on a 32x32 grayscale thumbnail, keeping the 8x8 lowest frequencies
+_PHASH_SIZE = 32
+_PHASH_DCT = _dct_matrix(_PHASH_SIZE)
+
+
 class ImageSecurity:
     """Security checks for uploaded images"""
     
@@ -136,8 +151,27 @@ class ImageSecurity:
     def compute_image_hash(image_bytes: bytes) -> str:
         """
         Compute SHA256 hash for duplicate detection
+        hashlib is OpenSSL-backed (SHA extensions where available) and
+        releases the GIL for large inputs, so it is safe to run in a thread.
+        Not used for security - allowed under FIPS-restricted OpenSSL builds.
+        """
+        return hashlib.sha256(image_bytes, usedforsecurity=False).hexdigest()
+
+    @staticmethod
+    def compute_perceptual_hash(image: Image.Image) -> int:
+        """
+        Compute 64-bit perceptual hash (pHash) for near-duplicate detection
+        Robust to re-compression and resizing, unlike the SHA256 hash.
+        Compare two hashes with: (a ^ b).bit_count()
         """
-        return hashlib.sha256(image_bytes).hexdigest()
+        gray = image.convert("L").resize(
+            (_PHASH_SIZE, _PHASH_SIZE), Image.Resampling.LANCZOS
+        )
+        pixels = np.asarray(gray, dtype=np.float64)
+        dct = _PHASH_DCT @ pixels @ _PHASH_DCT.T
+        low_freq = dct[:8, :8]
+        bits = (low_freq > np.median(low_freq)).flatten()
+        return int.from_bytes(np.packbits(bits).tobytes(), "big")
 
 
 class AuthSecurity:
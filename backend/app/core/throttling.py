@@ -0,0 +1,220 @@
+"""
+Outbound API throttling
+Client-side token bucket per provider, paused reactively by rate-limit headers,
+plus AIMD concurrency control driven by observed latency and overload statuses
+and retries with exponential backoff for transient failures
+"""
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from aiolimiter import AsyncLimiter
+from tenacity import (
+    RetryCallState,
+    retry,
+    retry_if_exception_type,
+    retry_if_result,
+    stop_after_attempt,
+    stop_before_delay,
+    wait_exponential_jitter,
+)
+import asyncio
+import time
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def retry_after_seconds(headers: httpx.Headers) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date)"""
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class OutboundLimiter:
+    """
+    Shapes calls to one external provider before they go on the wire
+    Token bucket for the steady RPM, plus a shared pause when the provider
+    reports it is (nearly) out of quota
+    """
+
+    def __init__(self, name: str, requests_per_minute: int):
+        self.name = name
+        self.requests_per_minute = max(1, requests_per_minute)
+        self._limiter = AsyncLimiter(max_rate=self.requests_per_minute, time_period=60)
+        self._resume_at = 0.0
+
+    async def acquire(self):
+        """Wait out any provider-requested pause, then take a token"""
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self._limiter.acquire()
+
+    def observe(self, response: httpx.Response):
+        """Pause later calls on 429 or when remaining quota drops below 10%"""
+        headers = response.headers
+        retry_after = retry_after_seconds(headers)
+
+        exhausted = response.status_code == 429
+        try:
+            remaining = int(headers["X-RateLimit-Remaining"])
+            limit = int(headers["X-RateLimit-Limit"])
+            exhausted = exhausted or remaining < limit * 0.1
+        except (KeyError, ValueError):
+            pass
+
+        if not exhausted:
+            return
+        if retry_after is None:
+            retry_after = 60.0 / self.requests_per_minute
+
+        self._resume_at = max(self._resume_at, time.monotonic() + retry_after)
+        logger.warning(f"⏳ {self.name} rate limit near - pausing {retry_after:.1f}s")
+
+
+# Upstream statuses that mean "back off"
+OVERLOAD_STATUSES = frozenset({429, 502, 503})
+
+
+class SlotOutcome:
+    """Filled in by the caller so the controller can judge the call"""
+
+    __slots__ = ("status_code",)
+
+    def __init__(self):
+        self.status_code: Optional[int] = None
+
+
+class ConcurrencyController:
+    """
+    AIMD concurrency limit for one external provider
+    Additive increase (+0.5) on fast successes, multiplicative decrease (x0.5)
+    on slow responses, overload statuses or transport failures
+    Calls cancelled by the caller (client disconnect) leave the limit alone
+    The decrease happens at most once per round trip: only calls started
+    after the previous cut can cut again
+    """
+
+    def __init__(
+        self,
+        name: str,
+        c_min: int = 1,
+        c_max: int = 8,
+        latency_target: float = 2.0,
+    ):
+        self.name = name
+        self.c_min = max(1, c_min)
+        self.c_max = max(self.c_min, c_max)
+        self.latency_target = latency_target
+        self.limit = float(self.c_max)
+        self._last_cut = float("-inf")
+        self._in_flight = 0
+        self._cond = asyncio.Condition()
+
+    def _adjust(self, status_code: Optional[int], start: float, end: float):
+        """Apply one AIMD step from a finished call"""
+        latency = end - start
+        if (
+            status_code is None
+            or status_code in OVERLOAD_STATUSES
+            or latency > self.latency_target
+        ):
+            if start < self._last_cut:
+                # Already in flight when the limit was last cut - same congestion event
+                return
+            self._last_cut = end
+            new_limit = max(self.c_min, self.limit * 0.5)
+            if int(new_limit) < int(self.limit):
+                logger.warning(
+                    f"📉 {self.name} concurrency {int(self.limit)} -> {int(new_limit)} "
+                    f"(status={status_code}, {latency:.2f}s)"
+                )
+        else:
+            new_limit = min(self.c_max, self.limit + 0.5)
+        self.limit = new_limit
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[SlotOutcome]:
+        """Hold one concurrency permit for the duration of a call"""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < int(self.limit))
+            self._in_flight += 1
+
+        outcome = SlotOutcome()
+        start = time.monotonic()
+        cancelled = False
+        try:
+            yield outcome
+        except asyncio.CancelledError:
+            # Our caller gave up - says nothing about the provider's health
+            cancelled = True
+            raise
+        finally:
+            if not cancelled:
+                self._adjust(outcome.status_code, start, time.monotonic())
+            async with self._cond:
+                self._in_flight -= 1
+                # Limit may have grown - wake every waiter to re-check
+                self._cond.notify_all()
+
+
+# Transient upstream statuses worth another attempt
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+RETRY_MAX_WAIT = 8.0
+# No new attempt once this much time (attempts + backoff) has been spent
+RETRY_DEADLINE = 10.0
+
+# Failures raised before the request reached the server - safe to repeat
+# even for non-idempotent calls (a read timeout may mean it was processed)
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+_backoff = wait_exponential_jitter(initial=0.5, max=RETRY_MAX_WAIT)
+
+
+def _retry_wait(retry_state: RetryCallState) -> float:
+    """Honour Retry-After on throttled responses, else jittered exponential backoff"""
+    outcome = retry_state.outcome
+    if outcome is not None and not outcome.failed:
+        retry_after = retry_after_seconds(outcome.result().headers)
+        if retry_after is not None:
+            return min(retry_after, RETRY_MAX_WAIT)
+    return _backoff(retry_state)
+
+
+def _last_outcome(retry_state: RetryCallState):
+    """Out of attempts: hand back the last response (or raise the last error)"""
+    logger.warning(f"🔁 Giving up after {retry_state.attempt_number} attempts")
+    return retry_state.outcome.result()
+
+
+def _retry_policy(errors):
+    """Retry the given transport errors and RETRY_STATUSES within RETRY_DEADLINE"""
+    return retry(
+        retry=(
+            retry_if_exception_type(errors)
+            | retry_if_result(lambda response: response.status_code in RETRY_STATUSES)
+        ),
+        wait=_retry_wait,
+        stop=stop_after_attempt(4) | stop_before_delay(RETRY_DEADLINE),
+        retry_error_callback=_last_outcome,
+    )
+
+
+# Decorators for coroutines returning an httpx.Response - up to 4 attempts,
+# none started past RETRY_DEADLINE
+# Idempotent calls (GET): any transport error, timeouts included
+retry_transient = _retry_policy(httpx.TransportError)
+# Non-idempotent calls (POST): only failures that never reached the server
+retry_unsent = _retry_policy(UNSENT_ERRORS)
@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.api import plant_recognition, chatbot, health
@@ -36,6 +37,10 @@ async def lifespan(app: FastAPI):
     try:
         from app.services.usda_service import usda_service
 
+        indexed = usda_service.load_index()
+        if indexed > 0:
+            logger.info(f" USDA index: {indexed} scientific names in memory")
+
         count = usda_service.get_count()
         if count > 0:
             logger.info(f" USDA Weaviate: {count} plants available")
@@ -44,6 +49,15 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"USDA service error: {e}")
 
+    # Image codec (JPEG decode/encode on every request)
+    try:
+        from PIL import features
+
+        turbo = features.check_feature("libjpeg_turbo")
+        logger.info(f" Pillow JPEG codec: {'libjpeg-turbo' if turbo else 'libjpeg'}")
+    except Exception as e:
+        logger.warning(f"Pillow feature check failed: {e}")
+
     # Check Kaggle Notebook API
     try:
         from app.services.kaggle_notebook_service import kaggle_notebook_service
@@ -89,6 +103,22 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Redis disconnect error: {e}")
 
+    # Close LLM provider connection pools
+    try:
+        from app.services.grok_service import grok_service
+
+        await grok_service.aclose()
+    except Exception as e:
+        logger.error(f"LLM client close error: {e}")
+
+    # Close shared outbound HTTP client
+    try:
+        from app.services.http_client import close_http_client
+
+        await close_http_client()
+    except Exception as e:
+        logger.error(f"HTTP client close error: {e}")
+
     logger.info(" Application shutdown complete")
 
 
@@ -100,6 +130,7 @@ app = FastAPI(
     redoc_url=f"{settings.API_V1_PREFIX}/redoc",
     openapi_url=f"{settings.API_V1_PREFIX}/openapi.json",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS Middleware
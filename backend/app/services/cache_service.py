@@ -0,0 +1,88 @@
+"""
+Response cache service
+Redis-backed JSON cache, falls back to an in-memory LRU if Redis unavailable
+"""
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from app.services.redis_service import redis_service
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CacheService:
+    """
+    JSON cache with Redis support
+    Falls back to a bounded in-memory LRU (with TTL) if Redis unavailable
+    """
+
+    def __init__(self, max_memory_entries: int = 512, max_phash_entries: int = 1024):
+        self.max_memory_entries = max_memory_entries
+        self.max_phash_entries = max_phash_entries
+        # In-memory fallback: key -> (expires_at, value)
+        self._memory_cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # Perceptual hash index: key -> (scope, phash)
+        self._phash_index: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+
+    def _get_memory(self, key: str) -> Optional[Any]:
+        """Read from in-memory cache (fallback)"""
+        entry = self._memory_cache.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._memory_cache[key]
+            return None
+
+        self._memory_cache.move_to_end(key)
+        return value
+
+    def _set_memory(self, key: str, value: Any, expire: int):
+        """Write to in-memory cache (fallback), evicting least recently used"""
+        self._memory_cache[key] = (time.monotonic() + expire, value)
+        self._memory_cache.move_to_end(key)
+        while len(self._memory_cache) > self.max_memory_entries:
+            self._memory_cache.popitem(last=False)
+
+    async def get_json(self, key: str) -> Optional[dict]:
+        """Get JSON value from cache"""
+        if redis_service.is_connected:
+            return await redis_service.get_json(key)
+        return self._get_memory(key)
+
+    async def set_json(self, key: str, value: dict, expire: int = 3600) -> bool:
+        """Set JSON value in cache with TTL"""
+        if redis_service.is_connected:
+            return await redis_service.set_json(key, value, expire)
+        self._set_memory(key, value, expire)
+        return True
+
+    # Near-duplicate lookup
+    def remember_phash(self, key: str, phash: int, scope: str = ""):
+        """Index a cached entry by its 64-bit perceptual hash"""
+        self._phash_index[key] = (scope, phash)
+        self._phash_index.move_to_end(key)
+        while len(self._phash_index) > self.max_phash_entries:
+            self._phash_index.popitem(last=False)
+
+    def find_similar(
+        self, phash: int, scope: str = "", max_distance: int = 8
+    ) -> Optional[str]:
+        """
+        Find the cached key whose perceptual hash is closest to phash
+        Linear scan over the bounded index, Hamming distance via popcount
+        """
+        best_key, best_distance = None, max_distance + 1
+        for key, (entry_scope, entry_phash) in self._phash_index.items():
+            if entry_scope != scope:
+                continue
+            distance = (phash ^ entry_phash).bit_count()
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+
+# Global instance
+cache_service = CacheService()
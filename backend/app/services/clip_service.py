@@ -2,10 +2,10 @@ from transformers import CLIPProcessor, CLIPModel
 from PIL import Image, ImageEnhance, ImageFilter
 import torch
 from typing import List, Union
-import io
 import numpy as np
 from app.core.config import settings
 from app.core.exceptions import CLIPModelError
+from app.utils.image_utils import image_processor
 import logging
 
 logger = logging.getLogger(__name__)
@@ -86,6 +86,10 @@ class CLIPService:
         
         return crops
         
+    def _to_device(self, inputs) -> dict:
+        """Move processor tensors to the model device"""
+        return {k: v.to(self.device) for k, v in inputs.items()}
+        
     def load_model(self):
         try:
             logger.info("Loading CLIP model...")
@@ -127,7 +131,7 @@ class CLIPService:
             
             # Convert bytes to PIL Image
             if isinstance(image, bytes):
-                image = Image.open(io.BytesIO(image))
+                image = image_processor.decode_image(image)
             
             # Convert to RGB
             if image.mode != "RGB":
@@ -142,19 +146,16 @@ class CLIPService:
                 logger.info(" Using multi-crop TTA for better accuracy...")
                 crops = self._multi_crop_augmentation(image)
                 
-                # Extract embeddings for all crops
-                all_embeddings = []
-                for idx, crop in enumerate(crops):
-                    inputs = self.processor(images=crop, return_tensors="pt")
-                    inputs = {k: v.to(self.device) for k, v in inputs.items()}
-                    
-                    with torch.no_grad():
-                        features = self.model.get_image_features(**inputs)
-                        features = features / features.norm(dim=-1, keepdim=True)
-                        all_embeddings.append(features)
+                # Extract embeddings for all crops in a single batched forward pass
+                inputs = self.processor(images=crops, return_tensors="pt")
+                inputs = self._to_device(inputs)
+                
+                with torch.no_grad():
+                    features = self.model.get_image_features(**inputs)
+                    features = features / features.norm(dim=-1, keepdim=True)
                 
                 # Average all embeddings (ensemble)
-                final_features = torch.stack(all_embeddings).mean(dim=0)
+                final_features = features.mean(dim=0, keepdim=True)
                 # Re-normalize after averaging
                 final_features = final_features / final_features.norm(dim=-1, keepdim=True)
                 
@@ -162,7 +163,7 @@ class CLIPService:
             else:
                 # Standard single-crop encoding
                 inputs = self.processor(images=image, return_tensors="pt")
-                inputs = {k: v.to(self.device) for k, v in inputs.items()}
+                inputs = self._to_device(inputs)
                 
                 with torch.no_grad():
                     final_features = self.model.get_image_features(**inputs)
@@ -190,7 +191,7 @@ class CLIPService:
                     raise Exception("Failed to load CLIP model")
             
             inputs = self.processor(text=[text], return_tensors="pt", padding=True)
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+            inputs = self._to_device(inputs)
             
             with torch.no_grad():
                 features = self.model.get_text_features(**inputs)
@@ -1,70 +1,128 @@
 """
 LLM Service - Multi-Provider with Automatic Fallback Chain
 Priority: GPT-5 (GitHub) → Google AI Studio (Gemini) → OpenRouter → Template
+A fallback starts as soon as the previous provider fails, or alongside it
+once it has been slower than LLM_HEDGE_DELAY; the first successful answer wins.
 """
 
+import asyncio
+import httpx
 import logging
-from typing import Optional, List, Tuple
+import re
+from typing import AsyncIterator, Dict, Optional, List, Tuple
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.core.exceptions import LLMServiceError
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = """Sen bir botanik uzmanısın. Kullanıcılara bitki tanımlama ve bilgi sağlama konusunda yardımcı oluyorsun.
+Yanıtlarını her zaman Türkçe olarak ver. Bilimsel ve yararlı bilgiler sun.
+Emojiler kullanarak yanıtlarını daha okunabilir yap."""
+
+_SYS_MSG = {"role": "system", "content": SYSTEM_PROMPT}
+
+# One LLM call per request at most per provider - httpx's default pool of 100 is oversized
+_LLM_HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+
+# Query-type keywords for the template fallback
+_CARE_KEYWORDS = frozenset({"bakım", "sulama", "yetiştir", "care"})
+_TOXIC_KEYWORDS = frozenset({"zehir", "tehlike", "toxic", "poison"})
+# Keywords are stems ("bakım" must match "bakımı"), so match as substrings
+# with one precompiled alternation instead of a per-keyword scan
+_CARE_PATTERN = re.compile("|".join(map(re.escape, sorted(_CARE_KEYWORDS))))
+_TOXIC_PATTERN = re.compile("|".join(map(re.escape, sorted(_TOXIC_KEYWORDS))))
+
+
+def _generate_template_response(prompt: str, context: Optional[str] = None) -> str:
+    """Last resort: Generate formatted plant response from context"""
+    if not context:
+        return "Bitki analizi yapıldı ancak eşleşen sonuç bulunamadı. Lütfen daha net bir görsel ile tekrar deneyin."
+
+    # Parse context to extract plant info
+    response_parts = ["🌿 **Görsel Analizi Tamamlandı!**\n"]
+
+    # Add context directly - it's already formatted
+    response_parts.append("**Bulunan Bitkiler:**")
+    response_parts.append(context)
+    response_parts.append("")
+
+    # Add helpful info based on query type
+    query_lower = prompt.lower()
+
+    if _CARE_PATTERN.search(query_lower):
+        response_parts.append("**💡 Bakım Önerileri:**")
+        response_parts.append("- Bitkinin türüne göre sulama ihtiyacı değişir")
+        response_parts.append("- Dolaylı güneş ışığı çoğu bitki için idealdir")
+        response_parts.append("- Toprağın üst kısmı kuruduğunda sulayın")
+
+    elif _TOXIC_PATTERN.search(query_lower):
+        response_parts.append("**⚠️ Uyarı:**")
+        response_parts.append("- Bazı bitkiler evcil hayvanlar için zararlı olabilir")
+        response_parts.append("- Detaylı bilgi için uzman görüşü alın")
+
+    else:
+        response_parts.append("**📝 Not:**")
+        response_parts.append(
+            "- Yukarıdaki bilgiler Kaggle PlantCLEF, PlantNet ve USDA veritabanlarından alınmıştır"
+        )
+        response_parts.append("- Kesin tanımlama için uzman görüşü önerilir")
+
+    return "\n".join(response_parts)
+
 
 class LLMService:
     """Multi-provider LLM service with automatic fallback chain"""
 
     def __init__(self):
-        self.providers: List[Tuple[str, Optional[AsyncOpenAI], str]] = []
+        # (name, base_url, api_key, model) - clients are created on first use
+        self.providers: List[Tuple[str, str, str, str]] = []
+        self._clients: Dict[str, AsyncOpenAI] = {}
         self._initialize_providers()
 
     def _initialize_providers(self):
-        """Initialize all available LLM providers in priority order"""
+        """Register all available LLM providers in priority order"""
         self.providers = []
 
         # 1. GPT-5 via GitHub Models (Primary)
         if settings.GITHUB_TOKEN:
-            try:
-                client = AsyncOpenAI(
-                    base_url=settings.GITHUB_MODELS_BASE_URL,
-                    api_key=settings.GITHUB_TOKEN,
-                )
-                self.providers.append(
-                    ("GPT-5 (GitHub)", client, settings.GITHUB_MODELS_MODEL)
-                )
-                logger.info(
-                    f"✅ Provider 1: GPT-5 via GitHub Models ({settings.GITHUB_MODELS_MODEL})"
+            self.providers.append(
+                (
+                    "GPT-5 (GitHub)",
+                    settings.GITHUB_MODELS_BASE_URL,
+                    settings.GITHUB_TOKEN,
+                    settings.GITHUB_MODELS_MODEL,
                 )
-            except Exception as e:
-                logger.warning(f"⚠️ GPT-5 init failed: {e}")
+            )
+            logger.info(
+                f"✅ Provider 1: GPT-5 via GitHub Models ({settings.GITHUB_MODELS_MODEL})"
+            )
 
         # 2. Google AI Studio (Gemini) - First Fallback
         if settings.GOOGLE_AI_STUDIO_API_KEY:
-            try:
-                client = AsyncOpenAI(
-                    base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-                    api_key=settings.GOOGLE_AI_STUDIO_API_KEY,
+            self.providers.append(
+                (
+                    "Google AI (Gemini)",
+                    "https://generativelanguage.googleapis.com/v1beta/openai/",
+                    settings.GOOGLE_AI_STUDIO_API_KEY,
+                    settings.GOOGLE_AI_STUDIO_MODEL,
                 )
-                self.providers.append(
-                    ("Google AI (Gemini)", client, settings.GOOGLE_AI_STUDIO_MODEL)
-                )
-                logger.info(
-                    f"✅ Provider 2: Google AI Studio ({settings.GOOGLE_AI_STUDIO_MODEL})"
-                )
-            except Exception as e:
-                logger.warning(f"⚠️ Google AI init failed: {e}")
+            )
+            logger.info(
+                f"✅ Provider 2: Google AI Studio ({settings.GOOGLE_AI_STUDIO_MODEL})"
+            )
 
         # 3. OpenRouter - Second Fallback
         if settings.OPENROUTER_API_KEY:
-            try:
-                client = AsyncOpenAI(
-                    base_url=settings.OPENROUTER_BASE_URL,
-                    api_key=settings.OPENROUTER_API_KEY,
+            self.providers.append(
+                (
+                    "OpenRouter",
+                    settings.OPENROUTER_BASE_URL,
+                    settings.OPENROUTER_API_KEY,
+                    settings.OPENROUTER_MODEL,
                 )
-                self.providers.append(("OpenRouter", client, settings.OPENROUTER_MODEL))
-                logger.info(f"✅ Provider 3: OpenRouter ({settings.OPENROUTER_MODEL})")
-            except Exception as e:
-                logger.warning(f"⚠️ OpenRouter init failed: {e}")
+            )
+            logger.info(f"✅ Provider 3: OpenRouter ({settings.OPENROUTER_MODEL})")
 
         if not self.providers:
             logger.warning(
@@ -75,25 +133,112 @@ class LLMService:
                 f"🔗 LLM Fallback chain: {' → '.join([p[0] for p in self.providers])} → Template"
             )
 
+    def _get_client(self, name: str, base_url: str, api_key: str) -> AsyncOpenAI:
+        """Create the provider client on first use (unused providers hold no pool)"""
+        client = self._clients.get(name)
+        if client is None:
+            client = AsyncOpenAI(
+                base_url=base_url,
+                api_key=api_key,
+                http_client=httpx.AsyncClient(limits=_LLM_HTTP_LIMITS),
+            )
+            self._clients[name] = client
+        return client
+
+    async def aclose(self):
+        """Close provider HTTP connection pools"""
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
+
     async def generate_response(
         self, prompt: str, context: Optional[str] = None
-    ) -> str:
-        """Generate response with automatic fallback through provider chain"""
+    ) -> Tuple[str, bool]:
+        """
+        Generate response with automatic fallback through provider chain
+        Returns (text, from_llm) - from_llm is False for the template fallback
+        """
+        if self.providers:
+            response = await self._race_providers(prompt, context)
+            if response is not None:
+                return response, True
 
-        # Try each provider in order
-        for provider_name, client, model in self.providers:
-            try:
+        # All providers failed - use template
+        logger.info("📝 All LLM providers failed - using template response")
+        return _generate_template_response(prompt, context), False
+
+    async def _race_providers(
+        self, prompt: str, context: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Hedged requests: start providers in priority order. The next one starts
+        when every running call has failed, or once the latest call has run for
+        LLM_HEDGE_DELAY seconds (tail latency) without an answer.
+        The first successful answer wins and the other calls are cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        names = {}
+        pending = set()
+        try:
+            for provider_name, base_url, api_key, model in self.providers:
                 logger.info(f"🔄 Trying {provider_name}...")
-                response = await self._call_provider(client, model, prompt, context)
+                client = self._get_client(provider_name, base_url, api_key)
+                task = asyncio.create_task(
+                    self._call_provider(client, model, prompt, context)
+                )
+                names[task] = provider_name
+                pending.add(task)
+
+                # Wait for an answer, for every running call to fail, or for
+                # the hedge delay to pass - only then bring in the next provider
+                hedge_at = loop.time() + settings.LLM_HEDGE_DELAY
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending,
+                        timeout=max(0.0, hedge_at - loop.time()),
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    response = self._first_success(done, names)
+                    if response is not None:
+                        return response
+                    if not done:
+                        break
+
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                response = self._first_success(done, names)
+                if response is not None:
+                    return response
+
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _first_success(self, done: set, names: dict) -> Optional[str]:
+        """Return the first successful answer among finished provider calls"""
+        for task in done:
+            provider_name = names[task]
+            if task.exception():
+                logger.warning(f"⚠️ {provider_name} failed: {task.exception()}")
+                continue
+            response = task.result()
+            if response:
                 logger.info(f"✅ {provider_name} succeeded")
                 return response
-            except Exception as e:
-                logger.warning(f"⚠️ {provider_name} failed: {e}")
-                continue
+            logger.warning(f"⚠️ {provider_name} returned an empty response")
+        return None
 
-        # All providers failed - use template
-        logger.info("📝 All LLM providers failed - using template response")
-        return self._generate_template_response(prompt, context)
+    def _build_messages(self, prompt: str, context: Optional[str] = None) -> list:
+        """Build chat messages (shared system prompt + user turn)"""
+        user_content = (
+            f"Bitki bilgileri:\n{context}\n\nKullanıcı sorusu: {prompt}"
+            if context
+            else prompt
+        )
+        return [_SYS_MSG, {"role": "user", "content": user_content}]
 
     async def _call_provider(
         self,
@@ -103,80 +248,72 @@ class LLMService:
         context: Optional[str] = None,
     ) -> str:
         """Call a specific LLM provider"""
-        system_prompt = """Sen bir botanik uzmanısın. Kullanıcılara bitki tanımlama ve bilgi sağlama konusunda yardımcı oluyorsun.
-Yanıtlarını her zaman Türkçe olarak ver. Bilimsel ve yararlı bilgiler sun.
-Emojiler kullanarak yanıtlarını daha okunabilir yap."""
-
-        messages = [
-            {"role": "system", "content": system_prompt},
-        ]
-
-        if context:
-            messages.append(
-                {
-                    "role": "user",
-                    "content": f"Bitki bilgileri:\n{context}\n\nKullanıcı sorusu: {prompt}",
-                }
-            )
-        else:
-            messages.append({"role": "user", "content": prompt})
-
         response = await client.chat.completions.create(
             model=model,
-            messages=messages,
+            messages=self._build_messages(prompt, context),
             timeout=settings.LLM_API_TIMEOUT,
         )
 
         return response.choices[0].message.content
 
-    def _generate_template_response(
+    async def stream_response(
         self, prompt: str, context: Optional[str] = None
-    ) -> str:
-        """Last resort: Generate formatted plant response from context"""
-        if not context:
-            return "Bitki analizi yapıldı ancak eşleşen sonuç bulunamadı. Lütfen daha net bir görsel ile tekrar deneyin."
-
-        # Parse context to extract plant info
-        response_parts = ["🌿 **Görsel Analizi Tamamlandı!**\n"]
-
-        # Add context directly - it's already formatted
-        response_parts.append("**Bulunan Bitkiler:**")
-        response_parts.append(context)
-        response_parts.append("")
-
-        # Add helpful info based on query type
-        query_lower = prompt.lower()
-
-        if any(word in query_lower for word in ["bakım", "sulama", "yetiştir", "care"]):
-            response_parts.append("**💡 Bakım Önerileri:**")
-            response_parts.append("- Bitkinin türüne göre sulama ihtiyacı değişir")
-            response_parts.append("- Dolaylı güneş ışığı çoğu bitki için idealdir")
-            response_parts.append("- Toprağın üst kısmı kuruduğunda sulayın")
-
-        elif any(
-            word in query_lower for word in ["zehir", "tehlike", "toxic", "poison"]
-        ):
-            response_parts.append("**⚠️ Uyarı:**")
-            response_parts.append(
-                "- Bazı bitkiler evcil hayvanlar için zararlı olabilir"
-            )
-            response_parts.append("- Detaylı bilgi için uzman görüşü alın")
+    ) -> AsyncIterator[Tuple[str, bool]]:
+        """
+        Stream (token, from_llm) pairs as they are generated.
+        Falls back to the next provider only if nothing was yielded yet;
+        a provider failing mid-answer raises LLMServiceError instead.
+        """
+        for provider_name, base_url, api_key, model in self.providers:
+            started = False
+            try:
+                logger.info(f"🔄 Streaming from {provider_name}...")
+                client = self._get_client(provider_name, base_url, api_key)
+                stream = await client.chat.completions.create(
+                    model=model,
+                    messages=self._build_messages(prompt, context),
+                    timeout=settings.LLM_API_TIMEOUT,
+                    stream=True,
+                )
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    token = chunk.choices[0].delta.content
+                    if token:
+                        started = True
+                        yield token, True
 
-        else:
-            response_parts.append("**📝 Not:**")
-            response_parts.append(
-                "- Yukarıdaki bilgiler Kaggle PlantCLEF, PlantNet ve USDA veritabanlarından alınmıştır"
-            )
-            response_parts.append("- Kesin tanımlama için uzman görüşü önerilir")
+                if started:
+                    logger.info(f"✅ {provider_name} stream completed")
+                    return
+                logger.warning(f"⚠️ {provider_name} returned an empty stream")
+            except Exception as e:
+                if started:
+                    # Tokens already sent to the client - cannot switch provider
+                    logger.warning(f"⚠️ {provider_name} stream interrupted: {e}")
+                    raise LLMServiceError(
+                        f"{provider_name} stream interrupted",
+                        {"provider": provider_name},
+                    ) from e
+                logger.warning(f"⚠️ {provider_name} failed: {e}")
 
-        return "\n".join(response_parts)
+        # All providers failed - use template
+        logger.info("📝 All LLM providers failed - using template response")
+        yield _generate_template_response(prompt, context), False
 
     async def generate_rag_response(
         self, query: str, context: str, plants: list = None
-    ) -> str:
+    ) -> Tuple[str, bool]:
         """RAG response with plant context"""
         return await self.generate_response(query, context)
 
+    async def stream_rag_response(
+        self, query: str, context: str, plants: list = None
+    ) -> AsyncIterator[Tuple[str, bool]]:
+        """Streaming RAG response with plant context"""
+        async for chunk in self.stream_response(query, context):
+            yield chunk
+
 
 # Global instance
 grok_service = LLMService()
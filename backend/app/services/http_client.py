@@ -0,0 +1,50 @@
+"""
+Shared outbound HTTP client
+One pooled httpx.AsyncClient (keep-alive + HTTP/2) reused by all external API calls
+"""
+from typing import Optional
+from app.core.config import settings
+import importlib.util
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _use_http2() -> bool:
+    """HTTP/2 multiplexing when enabled and the h2 package is installed"""
+    if not settings.HTTP2_ENABLED:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("⚠️ h2 not installed - outbound HTTP falls back to HTTP/1.1")
+        return False
+    return True
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        http2 = _use_http2()
+        _http_client = httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+        logger.info(f"🌐 Shared HTTP client created (http2={http2})")
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared client (application shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        logger.info("🌐 Shared HTTP client closed")
@@ -5,13 +5,15 @@ Sends user images to Kaggle Gradio API for processing with PlantCLEF dataset
 
 import os
 import io
-import json
+import orjson
 import base64
 import httpx
 from typing import Dict, Any, List
 from PIL import Image
 import logging
 from dotenv import load_dotenv
+from app.services.http_client import get_http_client
+from app.utils.image_utils import JPEG_MAGIC
 
 load_dotenv()
 
@@ -39,10 +41,10 @@ class KaggleNotebookService:
             return False
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.notebook_url}/config", timeout=10.0)
-                self._available = response.status_code == 200
-                return self._available
+            client = get_http_client()
+            response = await client.get(f"{self.notebook_url}/config", timeout=10.0)
+            self._available = response.status_code == 200
+            return self._available
         except Exception as e:
             logger.error(f"Kaggle health check failed: {e}")
             self._available = False
@@ -51,83 +53,92 @@ class KaggleNotebookService:
     async def identify_plant(
         self, image_bytes: bytes, top_k: int = 5
     ) -> List[Dict[str, Any]]:
-        """Identify plant using Kaggle Gradio API"""
+        """
+        Identify plant using Kaggle Gradio API
+
+        Args:
+            image_bytes: Raw image bytes (JPEG is sent without re-encoding)
+            top_k: Number of predictions to return
+        """
         if not self.notebook_url:
             logger.warning("Kaggle notebook URL not configured")
             return []
 
         try:
-            # Convert image to base64
-            image = Image.open(io.BytesIO(image_bytes))
-            if image.mode != "RGB":
-                image = image.convert("RGB")
-
-            buffer = io.BytesIO()
-            image.save(buffer, format="JPEG", quality=85)
-            image_base64 = base64.b64encode(buffer.getvalue()).decode()
-
-            async with httpx.AsyncClient() as client:
-                # Gradio 5.x: POST to /gradio_api/call/predict returns event_id
-                endpoint = f"{self.notebook_url}/gradio_api/call/predict"
-
-                # Image payload format for Gradio
-                payload = {
-                    "data": [
-                        {
-                            "url": f"data:image/jpeg;base64,{image_base64}",
-                            "meta": {"_type": "gradio.FileData"},
-                        }
-                    ]
-                }
-
-                logger.info(f"Calling Kaggle: {endpoint}")
-
-                # Step 1: Submit the request
-                response = await client.post(
-                    endpoint,
-                    json=payload,
-                    timeout=self.timeout,
-                )
+            # Convert image to base64 (JPEG bytes are sent as-is)
+            if image_bytes.startswith(JPEG_MAGIC):
+                jpeg_bytes = image_bytes
+            else:
+                image = Image.open(io.BytesIO(image_bytes))
+                if image.mode != "RGB":
+                    image = image.convert("RGB")
+
+                buffer = io.BytesIO()
+                image.save(buffer, format="JPEG", quality=85)
+                jpeg_bytes = buffer.getvalue()
+            image_base64 = base64.b64encode(jpeg_bytes).decode()
+
+            client = get_http_client()
+            # Gradio 5.x: POST to /gradio_api/call/predict returns event_id
+            endpoint = f"{self.notebook_url}/gradio_api/call/predict"
+
+            # Image payload format for Gradio
+            payload = {
+                "data": [
+                    {
+                        "url": f"data:image/jpeg;base64,{image_base64}",
+                        "meta": {"_type": "gradio.FileData"},
+                    }
+                ]
+            }
+
+            logger.info(f"Calling Kaggle: {endpoint}")
+
+            # Step 1: Submit the request
+            response = await client.post(
+                endpoint,
+                content=orjson.dumps(payload),
+                headers={"Content-Type": "application/json"},
+                timeout=self.timeout,
+            )
 
-                logger.info(f"Gradio call response: {response.status_code}")
+            logger.info(f"Gradio call response: {response.status_code}")
 
-                if response.status_code != 200:
-                    logger.error(f"Gradio API error: {response.text[:200]}")
-                    return []
+            if response.status_code != 200:
+                logger.error(f"Gradio API error: {response.text[:200]}")
+                return []
 
-                # Step 2: Get event_id from response
-                call_result = response.json()
-                logger.info(f"Call result: {json.dumps(call_result)[:200]}")
+            # Step 2: Get event_id from response
+            call_result = orjson.loads(response.content)
+            logger.info(f"Call result: {response.text[:200]}")
 
-                event_id = call_result.get("event_id")
-                if not event_id:
-                    logger.error("No event_id in Gradio response")
-                    return []
+            event_id = call_result.get("event_id")
+            if not event_id:
+                logger.error("No event_id in Gradio response")
+                return []
 
-                # Step 3: Fetch the result using event_id
-                result_endpoint = (
-                    f"{self.notebook_url}/gradio_api/call/predict/{event_id}"
-                )
-                logger.info(f"Fetching result: {result_endpoint}")
+            # Step 3: Fetch the result using event_id
+            result_endpoint = f"{self.notebook_url}/gradio_api/call/predict/{event_id}"
+            logger.info(f"Fetching result: {result_endpoint}")
 
-                result_response = await client.get(
-                    result_endpoint,
-                    timeout=self.timeout,
-                )
+            result_response = await client.get(
+                result_endpoint,
+                timeout=self.timeout,
+            )
 
-                logger.info(f"Result response: {result_response.status_code}")
+            logger.info(f"Result response: {result_response.status_code}")
 
-                if result_response.status_code != 200:
-                    logger.error(f"Result fetch error: {result_response.text[:200]}")
-                    return []
+            if result_response.status_code != 200:
+                logger.error(f"Result fetch error: {result_response.text[:200]}")
+                return []
 
-                # Parse SSE response (Server-Sent Events format)
-                result_text = result_response.text
-                logger.info(f"Result text: {result_text[:300]}")
+            # Parse SSE response (Server-Sent Events format)
+            result_text = result_response.text
+            logger.info(f"Result text: {result_text[:300]}")
 
-                # SSE format: "data: {...}\n\n"
-                predictions = self._parse_sse_response(result_text, top_k)
-                return predictions
+            # SSE format: "data: {...}\n\n"
+            predictions = self._parse_sse_response(result_text, top_k)
+            return predictions
 
         except httpx.TimeoutException:
             logger.error("Kaggle Gradio API timeout")
@@ -144,7 +155,7 @@ class KaggleNotebookService:
                 if line.startswith("data:"):
                     data_str = line[5:].strip()
                     if data_str:
-                        data = json.loads(data_str)
+                        data = orjson.loads(data_str)
 
                         # Gradio returns: [{"label": ..., "confidences": [...]}]
                         if isinstance(data, list) and len(data) > 0:
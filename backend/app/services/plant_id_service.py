@@ -3,10 +3,19 @@ Plant.id API Service - Get detailed plant information by scientific name
 https://plant.id
 """
 
+import asyncio
 import httpx
 from typing import Dict, Optional
 from app.core.config import settings
+from app.core.throttling import (
+    ConcurrencyController,
+    OutboundLimiter,
+    retry_transient,
+)
+from app.services.cache_service import cache_service
+from app.services.http_client import get_http_client
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -17,12 +26,32 @@ class PlantIdService:
     def __init__(self):
         self.api_key = settings.PLANT_ID_KEY
         self.api_url = settings.PLANT_ID_URL
+        self._limiter = OutboundLimiter("Plant.id", settings.PLANT_ID_RPM)
+        # Plant.id quota: bounded in-flight calls, fewer while it is struggling
+        self._controller = ConcurrencyController(
+            "Plant.id",
+            c_max=settings.PLANT_ID_MAX_CONCURRENCY,
+            latency_target=settings.PLANT_ID_API_TIMEOUT
+            * settings.OUTBOUND_LATENCY_TARGET_RATIO,
+        )
 
         if self.api_key:
             logger.info("✅ Plant.id API configured (for plant details)")
         else:
             logger.warning("⚠️ Plant.id API key not configured")
 
+    @retry_transient
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        """Throttled GET: rate limit token, then an AIMD concurrency slot (retried)"""
+        await self._limiter.acquire()
+        async with self._controller.slot() as slot:
+            response = await get_http_client().get(
+                url, timeout=float(settings.PLANT_ID_API_TIMEOUT), **kwargs
+            )
+            slot.status_code = response.status_code
+        self._limiter.observe(response)
+        return response
+
     async def get_plant_details(
         self, scientific_name: str, lang: str = "tr"
     ) -> Optional[Dict]:
@@ -40,6 +69,13 @@ class PlantIdService:
             logger.warning("Plant.id API key not configured, skipping")
             return None
 
+        # Same species recur across sessions - serve repeats from cache
+        cache_key = f"plantid:{lang}:{scientific_name.strip().lower()}"
+        cached = await cache_service.get_json(cache_key)
+        if cached is not None:
+            logger.info(f"⚡ Plant.id cache hit: {scientific_name}")
+            return cached
+
         try:
             headers = {
                 "Api-Key": self.api_key,
@@ -47,60 +83,58 @@ class PlantIdService:
             }
 
             # Try the knowledge base endpoint
-            async with httpx.AsyncClient(
-                timeout=float(settings.PLANT_ID_API_TIMEOUT)
-            ) as client:
-                # First try: KB search endpoint
-                response = await client.get(
-                    f"{self.api_url}/kb/plants/name_search",
-                    params={"q": scientific_name, "limit": 1},
-                    headers=headers,
-                )
-
-                if response.status_code == 200:
-                    result = response.json()
-                    entities = result.get("entities", [])
-
-                    if entities:
-                        entity = entities[0]
-                        access_token = entity.get("access_token")
-
-                        if access_token:
-                            # Get full details using access token
-                            detail_response = await client.get(
-                                f"{self.api_url}/kb/plants/{access_token}",
-                                params={
-                                    "details": "common_names,url,description,taxonomy,image,watering"
-                                },
-                                headers=headers,
+            # First try: KB search endpoint
+            response = await self._get(
+                f"{self.api_url}/kb/plants/name_search",
+                params={"q": scientific_name, "limit": 1},
+                headers=headers,
+            )
+
+            if response.status_code == 200:
+                result = orjson.loads(response.content)
+                entities = result.get("entities", [])
+
+                if entities:
+                    entity = entities[0]
+                    access_token = entity.get("access_token")
+
+                    if access_token:
+                        # Get full details using access token
+                        detail_response = await self._get(
+                            f"{self.api_url}/kb/plants/{access_token}",
+                            params={
+                                "details": "common_names,url,description,taxonomy,image,watering"
+                            },
+                            headers=headers,
+                        )
+
+                        if detail_response.status_code == 200:
+                            details = orjson.loads(detail_response.content)
+
+                            plant_info = {
+                                "scientific_name": scientific_name,
+                                "common_names": details.get("common_names", []),
+                                "description": details.get("description", {}).get(
+                                    "value", ""
+                                ),
+                                "taxonomy": details.get("taxonomy", {}),
+                                "watering": details.get("watering", {}),
+                                "image_url": details.get("image", {}).get("value", ""),
+                                "url": details.get("url", ""),
+                                "source": "plant.id",
+                            }
+
+                            logger.info(
+                                f"✅ Plant.id details retrieved for: {scientific_name}"
                             )
+                            await cache_service.set_json(
+                                cache_key, plant_info, settings.PLANT_ID_CACHE_TTL
+                            )
+                            return plant_info
 
-                            if detail_response.status_code == 200:
-                                details = detail_response.json()
-
-                                plant_info = {
-                                    "scientific_name": scientific_name,
-                                    "common_names": details.get("common_names", []),
-                                    "description": details.get("description", {}).get(
-                                        "value", ""
-                                    ),
-                                    "taxonomy": details.get("taxonomy", {}),
-                                    "watering": details.get("watering", {}),
-                                    "image_url": details.get("image", {}).get(
-                                        "value", ""
-                                    ),
-                                    "url": details.get("url", ""),
-                                    "source": "plant.id",
-                                }
-
-                                logger.info(
-                                    f"✅ Plant.id details retrieved for: {scientific_name}"
-                                )
-                                return plant_info
-
-                # Fallback: Return basic info if API doesn't return details
-                logger.info(f"ℹ️ Plant.id: No detailed info for {scientific_name}")
-                return None
+            # Fallback: Return basic info if API doesn't return details
+            logger.info(f"ℹ️ Plant.id: No detailed info for {scientific_name}")
+            return None
 
         except httpx.HTTPStatusError as e:
             logger.error(f"Plant.id API HTTP error: {e.response.status_code}")
@@ -122,22 +156,27 @@ class PlantIdService:
         if not self.api_key:
             return plants
 
-        for plant in plants[:3]:  # Only enrich top 3 to save API calls
-            scientific_name = plant.get("scientificName", "")
-            if scientific_name:
-                details = await self.get_plant_details(scientific_name)
-                if details:
-                    plant["plant_id_details"] = details
-                    # Add description if available
-                    if details.get("description"):
-                        plant["description"] = details["description"]
-                    # Add common names if missing
-                    if not plant.get("commonName") and details.get("common_names"):
-                        plant["commonName"] = (
-                            details["common_names"][0]
-                            if details["common_names"]
-                            else ""
-                        )
+        # Only enrich top 3 to save API calls - fetched concurrently
+        targets = [plant for plant in plants[:3] if plant.get("scientificName")]
+        results = await asyncio.gather(
+            *(self.get_plant_details(plant["scientificName"]) for plant in targets),
+            return_exceptions=True,
+        )
+
+        for plant, details in zip(targets, results):
+            if isinstance(details, Exception):
+                logger.error(f"Plant.id enrichment error: {details}")
+                continue
+            if details:
+                plant["plant_id_details"] = details
+                # Add description if available
+                if details.get("description"):
+                    plant["description"] = details["description"]
+                # Add common names if missing
+                if not plant.get("commonName") and details.get("common_names"):
+                    plant["commonName"] = (
+                        details["common_names"][0] if details["common_names"] else ""
+                    )
 
         return plants
 
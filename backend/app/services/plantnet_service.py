@@ -1,24 +1,50 @@
 import httpx
 from app.core.config import settings
+from app.core.throttling import (
+    ConcurrencyController,
+    OutboundLimiter,
+    retry_unsent,
+)
+from app.services.http_client import get_http_client
+from app.utils.image_utils import JPEG_MAGIC
 from typing import Optional, Dict, Any, List
 from PIL import Image
 import io
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# JPEGs up to this size are uploaded as-is; larger ones are downscaled first
+MAX_JPEG_BYTES = 4_000_000
+OVERSIZED_MAX_SIDE = 2048
+
 
 def _ensure_jpeg(image_data: bytes) -> bytes:
-    """Ensure image is in JPEG format for PlantNet API compatibility"""
+    """
+    Ensure image is in JPEG format for PlantNet API compatibility
+    JPEG bytes up to MAX_JPEG_BYTES pass through untouched (magic sniff, no
+    decode); anything else is re-encoded in memory
+    """
+    oversized = False
+    if image_data.startswith(JPEG_MAGIC):
+        if len(image_data) <= MAX_JPEG_BYTES:
+            return image_data
+        oversized = True
+
     try:
         img = Image.open(io.BytesIO(image_data))
         if img.mode in ("RGBA", "P", "LA"):
             img = img.convert("RGB")
-
-        # Convert to JPEG
-        output = io.BytesIO()
-        img.save(output, format="JPEG", quality=95)
-        return output.getvalue()
+        if oversized:
+            # Huge JPEGs are shrunk rather than uploaded verbatim
+            img.thumbnail((OVERSIZED_MAX_SIDE, OVERSIZED_MAX_SIDE))
+
+        # Convert to JPEG - plain bytes: httpx would force a file-backed upload
+        # onto disk (fileno()) and read it synchronously, and bytes survive retries
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=95)
+        return buffer.getvalue()
     except Exception as e:
         logger.error(f"Image conversion error: {e}")
         return image_data
@@ -28,6 +54,28 @@ class PlantNetService:
     def __init__(self):
         self.api_key = settings.PLANTNET_API_KEY
         self.api_url = settings.PLANTNET_API_URL
+        self._limiter = OutboundLimiter("PlantNet", settings.PLANTNET_RPM)
+        self._controller = ConcurrencyController(
+            "PlantNet",
+            c_max=8,
+            latency_target=settings.PLANTNET_API_TIMEOUT
+            * settings.OUTBOUND_LATENCY_TARGET_RATIO,
+        )
+
+    @retry_unsent
+    async def _post(self, **kwargs) -> httpx.Response:
+        """
+        Throttled POST: rate limit token, then an AIMD concurrency slot
+        Retried only when the upload never reached PlantNet (or on RETRY_STATUSES)
+        """
+        await self._limiter.acquire()
+        async with self._controller.slot() as slot:
+            response = await get_http_client().post(
+                self.api_url, timeout=float(settings.PLANTNET_API_TIMEOUT), **kwargs
+            )
+            slot.status_code = response.status_code
+        self._limiter.observe(response)
+        return response
 
     async def identify_plant(
         self, image_data: bytes, organ: str = "auto"
@@ -58,49 +106,40 @@ class PlantNetService:
 
             params = {"api-key": self.api_key}
 
-            async with httpx.AsyncClient(
-                timeout=float(settings.PLANTNET_API_TIMEOUT)
-            ) as client:
-                response = await client.post(
-                    self.api_url, files=files, data=data, params=params
+            response = await self._post(files=files, data=data, params=params)
+            response.raise_for_status()
+            result = orjson.loads(response.content)
+
+            # Parse results
+            plants = []
+            for r in result.get("results", [])[:5]:
+                species = r.get("species") or {}
+                scientific_name = species.get("scientificNameWithoutAuthor", "Unknown")
+                common_names = species.get("commonNames")
+                common_name = common_names[0] if common_names else ""
+                score = r.get("score", 0)
+
+                plant_data = {
+                    "scientific_name": scientific_name,
+                    "scientificName": scientific_name,
+                    "common_name": common_name,
+                    "commonName": common_name,
+                    "family": (species.get("family") or {}).get(
+                        "scientificNameWithoutAuthor", ""
+                    ),
+                    "genus": (species.get("genus") or {}).get("scientificName", ""),
+                    "score": score,
+                    "certainty": score,
+                    "source": "plantnet",
+                    "gbif_id": (r.get("gbif") or {}).get("id"),
+                }
+
+                plants.append(plant_data)
+                logger.info(
+                    f"✅ PlantNet found: {plant_data['scientific_name']} (score: {plant_data['score']:.2%})"
                 )
-                response.raise_for_status()
-                result = response.json()
-
-                # Parse results
-                plants = []
-                for r in result.get("results", [])[:5]:
-                    species = r.get("species", {})
-
-                    plant_data = {
-                        "scientific_name": species.get(
-                            "scientificNameWithoutAuthor", "Unknown"
-                        ),
-                        "scientificName": species.get(
-                            "scientificNameWithoutAuthor", "Unknown"
-                        ),
-                        "common_name": species.get("commonNames", [""])[0]
-                        if species.get("commonNames")
-                        else "",
-                        "commonName": species.get("commonNames", [""])[0]
-                        if species.get("commonNames")
-                        else "",
-                        "family": species.get("family", {}).get(
-                            "scientificNameWithoutAuthor", ""
-                        ),
-                        "genus": species.get("genus", {}).get("scientificName", ""),
-                        "score": r.get("score", 0),
-                        "certainty": r.get("score", 0),
-                        "source": "plantnet",
-                        "gbif_id": r.get("gbif", {}).get("id"),
-                    }
-
-                    plants.append(plant_data)
-                    logger.info(
-                        f"✅ PlantNet found: {plant_data['scientific_name']} (score: {plant_data['score']:.2%})"
-                    )
-
-                return plants
+
+            return plants
 
         except httpx.HTTPStatusError as e:
             logger.error(
@@ -143,44 +182,39 @@ class PlantNetService:
             data = {"organs": organ}
             params = {"api-key": self.api_key}
 
-            async with httpx.AsyncClient(
-                timeout=float(settings.PLANTNET_API_TIMEOUT)
-            ) as client:
-                response = await client.post(
-                    self.api_url, files=files, data=data, params=params
+            response = await self._post(files=files, data=data, params=params)
+            response.raise_for_status()
+            result = orjson.loads(response.content)
+
+            # Detailed parse
+            plants = []
+            for r in result.get("results", [])[:top_k]:
+                species = r.get("species") or {}
+
+                plant_data = {
+                    "scientific_name": species.get(
+                        "scientificNameWithoutAuthor", "Unknown"
+                    ),
+                    "scientific_name_full": species.get("scientificName", ""),
+                    "common_names": species.get("commonNames", []),
+                    "family": (species.get("family") or {}).get(
+                        "scientificNameWithoutAuthor", ""
+                    ),
+                    "genus": (species.get("genus") or {}).get("scientificName", ""),
+                    "score": r.get("score", 0),
+                    "images": [
+                        (img.get("url") or {}).get("o", "")
+                        for img in r.get("images", [])[:3]
+                    ],
+                    "gbif_id": (r.get("gbif") or {}).get("id"),
+                }
+
+                plants.append(plant_data)
+                logger.info(
+                    f"PlantNet found: {plant_data['scientific_name']} (score: {plant_data['score']:.2f})"
                 )
-                response.raise_for_status()
-                result = response.json()
-
-                # Detailed parse
-                plants = []
-                for r in result.get("results", [])[:top_k]:
-                    species = r.get("species", {})
-
-                    plant_data = {
-                        "scientific_name": species.get(
-                            "scientificNameWithoutAuthor", "Unknown"
-                        ),
-                        "scientific_name_full": species.get("scientificName", ""),
-                        "common_names": species.get("commonNames", []),
-                        "family": species.get("family", {}).get(
-                            "scientificNameWithoutAuthor", ""
-                        ),
-                        "genus": species.get("genus", {}).get("scientificName", ""),
-                        "score": r.get("score", 0),
-                        "images": [
-                            img.get("url", {}).get("o", "")
-                            for img in r.get("images", [])[:3]
-                        ],
-                        "gbif_id": r.get("gbif", {}).get("id"),
-                    }
-
-                    plants.append(plant_data)
-                    logger.info(
-                        f"PlantNet found: {plant_data['scientific_name']} (score: {plant_data['score']:.2f})"
-                    )
-
-                return plants
+
+            return plants
 
         except httpx.HTTPStatusError as e:
             logger.error(f"PlantNet API HTTP error: {e.response.status_code}")
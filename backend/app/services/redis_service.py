@@ -1,10 +1,10 @@
 """
 Redis service for caching and rate limiting
 """
-from typing import Optional
+from typing import Optional, Union
 import redis.asyncio as redis
 from app.core.config import settings
-import json
+import orjson
 import logging
 
 logger = logging.getLogger(__name__)
@@ -58,7 +58,7 @@ class RedisService:
             logger.error(f"Redis GET error: {e}")
             return None
     
-    async def set(self, key: str, value: str, expire: int = 3600):
+    async def set(self, key: str, value: Union[str, bytes], expire: int = 3600):
         """Set value in cache with TTL"""
         if not self.is_connected:
             return False
@@ -74,16 +74,15 @@ class RedisService:
         value = await self.get(key)
         if value:
             try:
-                return json.loads(value)
-            except json.JSONDecodeError:
+                return orjson.loads(value)
+            except orjson.JSONDecodeError:
                 return None
         return None
     
     async def set_json(self, key: str, value: dict, expire: int = 3600):
         """Set JSON value in cache"""
         try:
-            json_str = json.dumps(value)
-            return await self.set(key, json_str, expire)
+            return await self.set(key, orjson.dumps(value), expire)
         except Exception as e:
             logger.error(f"Redis SET JSON error: {e}")
             return False
@@ -1,11 +1,14 @@
 """
 USDA Plants Service - Weaviate Cloud Integration
 Queries 93K plants from Weaviate Cloud for validation and enrichment
+Scientific name lookups are served from an in-memory index of plantlst.txt
 """
 
+import csv
 import logging
+from pathlib import Path
 from typing import Dict, List, Optional, Any
-from app.core.config import settings
+from app.core.config import settings, BASE_DIR
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +24,71 @@ class USDAPlantService:
     def __init__(self):
         self._weaviate_client = None
         self._class_name = "USDAPlant"
+        # lowercased "genus species" -> plant dict
+        self._by_sci: Dict[str, Dict[str, str]] = {}
+        self._index_loaded = False
+        self._index_attempted = False
+
+    def _resolve_plants_file(self) -> Optional[Path]:
+        """Locate USDA_PLANTS_FILE relative to cwd, backend/ or the repo root"""
+        path = Path(settings.USDA_PLANTS_FILE)
+        candidates = [path] if path.is_absolute() else [
+            path,
+            BASE_DIR / path,
+            BASE_DIR.parent / path,
+        ]
+        for candidate in candidates:
+            if candidate.is_file():
+                return candidate
+        return None
+
+    def load_index(self) -> int:
+        """
+        Build the scientific name index from plantlst.txt (once)
+
+        Accepted names win over synonyms so common name and family are filled.
+        Returns the number of indexed names (0 if the file is not available).
+        """
+        if self._index_attempted:
+            return len(self._by_sci) if self._index_loaded else 0
+        self._index_attempted = True
+
+        plants_file = self._resolve_plants_file()
+        if plants_file is None:
+            logger.warning(
+                f"USDA file not found ({settings.USDA_PLANTS_FILE}) - using Weaviate lookups"
+            )
+            return 0
+
+        index: Dict[str, Dict[str, str]] = {}
+        try:
+            with open(plants_file, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    scientific_name = row.get("Scientific Name with Author", "")
+                    key = self._extract_base_name(scientific_name).lower()
+                    if not key:
+                        continue
+
+                    is_accepted = not row.get("Synonym Symbol")
+                    existing = index.get(key)
+                    if existing is None or (
+                        is_accepted and existing["synonym_symbol"]
+                    ):
+                        index[key] = {
+                            "symbol": row.get("Symbol", ""),
+                            "synonym_symbol": row.get("Synonym Symbol", ""),
+                            "scientific_name": scientific_name,
+                            "common_name": row.get("Common Name", ""),
+                            "family": row.get("Family", ""),
+                        }
+        except Exception as e:
+            logger.error(f"USDA index load error: {e}")
+            return 0
+
+        self._by_sci = index
+        self._index_loaded = True
+        logger.info(f"USDA index loaded: {len(index)} scientific names")
+        return len(index)
 
     def _get_client(self):
         """Lazy load Weaviate client"""
@@ -37,7 +105,10 @@ class USDAPlantService:
 
     def find_by_scientific_name(self, scientific_name: str) -> Optional[Dict[str, str]]:
         """
-        Find plant by scientific name using Weaviate text search
+        Find plant by scientific name
+
+        Uses the in-memory plantlst.txt index (O(1) dict lookup) when available,
+        otherwise Weaviate text search with results memoized per name.
 
         Args:
             scientific_name: Scientific name to search (e.g., "Rosa damascena")
@@ -45,6 +116,40 @@ class USDAPlantService:
         Returns:
             Plant dict with symbol, scientificName, commonName, family
         """
+        key = self._extract_base_name(scientific_name.strip()).lower()
+        if not key:
+            return None
+
+        self.load_index()
+        if self._index_loaded or key in self._by_sci:
+            return self._by_sci.get(key)
+
+        # Only memoize hits - a miss may be a transient Weaviate error
+        plant = self._search_scientific_name(scientific_name)
+        if plant:
+            self._by_sci[key] = plant
+        return plant
+
+    def find_many(self, scientific_names: List[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Batch variant of find_by_scientific_name
+
+        Returns:
+            Dict of scientific name -> plant dict, containing only the names found
+        """
+        self.load_index()
+        if not self._index_loaded:
+            hits = {name: self.find_by_scientific_name(name) for name in scientific_names}
+            return {name: plant for name, plant in hits.items() if plant}
+
+        by_sci, base_name = self._by_sci, self._extract_base_name
+        hits = {
+            name: by_sci.get(base_name(name.strip()).lower()) for name in scientific_names
+        }
+        return {name: plant for name, plant in hits.items() if plant}
+
+    def _search_scientific_name(self, scientific_name: str) -> Optional[Dict[str, str]]:
+        """Find plant by scientific name using Weaviate text search"""
         client = self._get_client()
         if not client:
             logger.warning("Weaviate client not available")
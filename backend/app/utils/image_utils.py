@@ -2,8 +2,38 @@ import cv2
 import numpy as np
 from PIL import Image
 import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Optional: libjpeg-turbo decoder straight to an RGB ndarray (PyTurboJPEG)
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+
+    _turbo_jpeg = TurboJPEG()
+except Exception:  # package or libturbojpeg shared library not installed
+    _turbo_jpeg = None
+
+# JPEG SOI marker - sniffs already-encoded JPEG uploads without decoding them
+JPEG_MAGIC = b"\xff\xd8\xff"
 
 class ImageProcessor:
+    @staticmethod
+    def decode_image(image_bytes: bytes) -> Image.Image:
+        """Decode to an RGB image - TurboJPEG for JPEG when available, else PIL"""
+        if _turbo_jpeg is not None and image_bytes.startswith(JPEG_MAGIC):
+            try:
+                return Image.fromarray(
+                    _turbo_jpeg.decode(image_bytes, pixel_format=TJPF_RGB)
+                )
+            except Exception as e:
+                logger.warning(f"TurboJPEG decode failed, falling back to PIL: {e}")
+
+        image = Image.open(io.BytesIO(image_bytes))
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        return image
+
     @staticmethod
     def resize_image(image: Image.Image, max_size=(800, 800)) -> Image.Image:
         image.thumbnail(max_size, Image.Resampling.LANCZOS)
@@ -9,6 +9,8 @@
 !pip install -q sentence-transformers pillow
 
 import os
+import contextlib
+import hashlib
 import gradio as gr
 import torch
 from PIL import Image
@@ -32,25 +34,56 @@ from sentence_transformers import SentenceTransformer
 # This model is more stable in Kaggle environment
 clip_model = SentenceTransformer('clip-ViT-B-32')
 clip_model = clip_model.to(device)
-print("✅ CLIP model loaded")
+
+# Half precision on GPU: bf16 on Ampere+, fp16 otherwise (e.g. Kaggle T4/P100)
+# Check the compute capability - is_bf16_supported() also reports emulated bf16 (T4)
+if device == "cuda":
+    bf16_native = torch.cuda.get_device_capability()[0] >= 8
+    infer_dtype = torch.bfloat16 if bf16_native else torch.float16
+    clip_model = clip_model.to(dtype=infer_dtype)
+else:
+    infer_dtype = torch.float32
+
+def inference_mode():
+    """Autocast so fp32 preprocessor outputs meet the half-precision weights"""
+    if device == "cuda":
+        return torch.autocast(device_type="cuda", dtype=infer_dtype)
+    return contextlib.nullcontext()
+
+print(f"✅ CLIP model loaded ({infer_dtype})")
 
 # =============================================================
 # PlantCLEF Species - Load from Dataset
 # =============================================================
 DATASET_PATH = "/kaggle/input/plantclef2025"
+# Species folders sit near the top of the dataset; deeper levels only hold images
+MAX_SCAN_DEPTH = 3
+_UNDERSCORE_TO_SPACE = str.maketrans("_", " ")
 
 def load_species():
-    """Load species from PlantCLEF dataset folders"""
+    """Load species from PlantCLEF dataset folders (directory entries only, no file stats)"""
     species = set()
     
     if os.path.exists(DATASET_PATH):
         print(f"📂 Scanning: {DATASET_PATH}")
-        for root, dirs, files in os.walk(DATASET_PATH):
-            for d in dirs:
-                if not d.startswith('.') and not d.startswith('_'):
-                    name = d.replace('_', ' ').strip()
-                    if len(name) >= 3:
-                        species.add(name)
+        stack = [(DATASET_PATH, 1)]
+        while stack:
+            path, depth = stack.pop()
+            try:
+                with os.scandir(path) as entries:
+                    subdirs = [e for e in entries if e.is_dir(follow_symlinks=False)]
+            except OSError as e:
+                print(f"⚠️ Cannot scan {path}: {e}")
+                continue
+            # "Rosa_gallica" -> "Rosa gallica"; hidden / underscore-prefixed folders skipped
+            names = (
+                e.name.translate(_UNDERSCORE_TO_SPACE).strip()
+                for e in subdirs
+                if e.name[:1] not in "._"
+            )
+            species.update(name for name in names if len(name) >= 3)
+            if depth < MAX_SCAN_DEPTH:
+                stack.extend((e.path, depth + 1) for e in subdirs)
         print(f"✅ Found {len(species)} species from dataset")
     
     return sorted(list(species))
@@ -91,67 +124,149 @@ if len(species_list) < 100:
 print(f"🌿 Total species: {len(species_list)}")
 
 # =============================================================
-# Pre-compute text embeddings for species (once)
+# Pre-compute text embeddings for species (once, cached on disk)
 # =============================================================
-print("📊 Computing species embeddings...")
-
 # Create descriptive prompts for better matching
 species_prompts = [f"a photograph of {sp}, a plant species" for sp in species_list]
-species_embeddings = clip_model.encode(species_prompts, convert_to_tensor=True, device=device)
-species_embeddings = species_embeddings / species_embeddings.norm(dim=-1, keepdim=True)
+
+# Cache is valid while the model and the prompts (i.e. the species list) are unchanged
+EMBEDDING_CACHE = (
+    "/kaggle/working/species_emb.pt" if os.path.isdir("/kaggle/working") else "species_emb.pt"
+)
+cache_hash = hashlib.sha1("\n".join(["clip-ViT-B-32"] + species_prompts).encode()).hexdigest()
+
+species_embeddings = None
+if os.path.exists(EMBEDDING_CACHE):
+    try:
+        cached = torch.load(EMBEDDING_CACHE, map_location="cpu")
+        if cached.get("hash") == cache_hash:
+            species_embeddings = cached["emb"].to(device)
+            print(f"⚡ Loaded cached species embeddings: {EMBEDDING_CACHE}")
+    except Exception as e:
+        print(f"⚠️ Embedding cache unreadable, recomputing: {e}")
+
+if species_embeddings is None:
+    print("📊 Computing species embeddings...")
+    with inference_mode():
+        species_embeddings = clip_model.encode(
+            species_prompts, convert_to_tensor=True, device=device, normalize_embeddings=True
+        )
+    torch.save({"hash": cache_hash, "emb": species_embeddings.cpu()}, EMBEDDING_CACHE)
+    print(f"💾 Saved species embeddings: {EMBEDDING_CACHE}")
+
+# Unit vectors, stored transposed + contiguous so scoring is a single plain matmul
+species_matrix = species_embeddings.to(infer_dtype).T.contiguous()
 
 print(f"✅ Pre-computed embeddings for {len(species_list)} species")
 
 # =============================================================
 # Plant Identification Function
 # =============================================================
-def identify_plant(image, top_k=5):
-    """Identify plant using CLIP zero-shot classification"""
-    if image is None:
-        return {"Error: No image": 1.0}
+# Gradio groups concurrent requests into one batch (up to this size)
+MAX_BATCH_SIZE = 16
+
+TOP_K = 5
+
+def _score_eager(image_embeddings, k=TOP_K):
+    """Cosine similarities (stay on GPU) + top-k - ranking needs no softmax"""
+    return torch.topk(image_embeddings @ species_matrix, k=min(k, len(species_list)), dim=-1)
+
+# Fixed-shape scoring kernel: batches are zero-padded to MAX_BATCH_SIZE so the compiled
+# graph (matmul + topk) never sees a new shape. No CUDA graphs: Gradio calls from worker
+# threads, and cudagraph trees keep per-thread state
+_score_compiled = None
+if device == "cuda":
+    try:
+        _score_compiled = torch.compile(
+            _score_eager, mode="max-autotune-no-cudagraphs", dynamic=False
+        )
+        # Warm-up: compile + autotune before the first request
+        _score_compiled(
+            torch.zeros(MAX_BATCH_SIZE, species_matrix.shape[0], device=device, dtype=infer_dtype)
+        )
+        print("✅ Compiled scoring kernel")
+    except Exception as e:
+        print(f"⚠️ torch.compile unavailable, using eager scoring: {e}")
+        _score_compiled = None
+
+def score(image_embeddings, k=TOP_K):
+    """Top-k (similarities, indices) per row, via the compiled kernel when possible"""
+    global _score_compiled
+    if _score_compiled is None or k != TOP_K:
+        return _score_eager(image_embeddings, k)
+    n = image_embeddings.shape[0]
+    padded = image_embeddings.new_zeros((MAX_BATCH_SIZE, image_embeddings.shape[1]))
+    padded[:n] = image_embeddings
+    try:
+        top_sims, top_idx = _score_compiled(padded)
+    except Exception as e:
+        # Recompile / runtime failure: fall back to eager for good, don't fail the batch
+        print(f"⚠️ Compiled scoring failed, switching to eager: {e}")
+        _score_compiled = None
+        return _score_eager(image_embeddings, k)
+    return top_sims[:n], top_idx[:n]
+
+def _to_pil(image):
+    """Gradio numpy array / PIL image -> RGB PIL image"""
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+    return image.convert("RGB")
+
+def identify_plants(images, top_k=TOP_K):
+    """Identify a batch of plants using CLIP zero-shot classification (one GPU pass)"""
+    outputs = [{"Error: No image": 1.0} if image is None else None for image in images]
+    valid = [i for i, image in enumerate(images) if image is not None]
+    if not valid:
+        return [outputs]
     
     try:
-        # Convert to PIL
-        if isinstance(image, np.ndarray):
-            image = Image.fromarray(image)
-        image = image.convert("RGB")
+        pil_images = [_to_pil(images[i]) for i in valid]
         
-        # Get image embedding
-        image_embedding = clip_model.encode(image, convert_to_tensor=True, device=device)
-        image_embedding = image_embedding / image_embedding.norm()
+        # Get image embeddings - whole batch in one encode call
+        with inference_mode():
+            image_embeddings = clip_model.encode(
+                pil_images,
+                convert_to_tensor=True,
+                device=device,
+                batch_size=MAX_BATCH_SIZE,
+                normalize_embeddings=True,
+            )
         
-        # Compute similarities
-        similarities = (image_embedding @ species_embeddings.T).cpu().numpy()
+        # Top-k results - topk instead of a full argsort
+        top_sims, top_idx = score(image_embeddings.to(infer_dtype), top_k)
         
-        # Softmax to get probabilities
-        exp_sim = np.exp(similarities * 10)  # Temperature scaling
-        probs = exp_sim / exp_sim.sum()
+        # Display probabilities: softmax over the top-k only (fp32, temperature scaled).
+        # Ratios between them match the full softmax, which is what the backend uses.
+        probs = torch.softmax(top_sims.float() * 10, dim=-1)
         
-        # Top-k results
-        top_idx = probs.argsort()[::-1][:top_k]
-        
-        results = {}
-        for idx in top_idx:
-            results[species_list[idx]] = float(probs[idx])
-            print(f"  → {species_list[idx]}: {probs[idx]:.2%}")
-        
-        return results
+        for i, row_idx, row_probs in zip(valid, top_idx.tolist(), probs.tolist()):
+            results = {}
+            for idx, prob in zip(row_idx, row_probs):
+                results[species_list[idx]] = prob
+                print(f"  → {species_list[idx]}: {prob:.2%}")
+            outputs[i] = results
         
     except Exception as e:
         print(f"❌ Error: {e}")
         import traceback
         traceback.print_exc()
-        return {f"Error: {str(e)}": 1.0}
+        for i in valid:
+            outputs[i] = {f"Error: {str(e)}": 1.0}
+    
+    # Gradio batch functions return one list per output component
+    return [outputs]
 
 # =============================================================
 # Gradio Interface
 # =============================================================
 demo = gr.Interface(
-    fn=identify_plant,
+    fn=identify_plants,
     inputs=gr.Image(label="🌿 Upload Plant Image"),
     outputs=gr.Label(num_top_classes=5, label="🔍 Identified Plants"),
     title="🌿 PlantCLEF Recognition AI",
     description=f"CLIP Zero-Shot | {len(species_list)} species",
+    batch=True,
+    max_batch_size=MAX_BATCH_SIZE,
 )
 
 print("\n🚀 Starting server...")